@@ -0,0 +1,151 @@
+import asyncio
+from uuid import uuid4
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo.errors import DuplicateKeyError
+
+from .config import Settings
+from .database import (
+    Database,
+    get_lock_collection,
+    get_product_collection,
+    get_order_collection,
+    get_product_archive_collection,
+    get_order_archive_collection
+)
+
+# --- Movimiento entre colecciones ---
+
+async def mover_a_archivo(origen, destino, filtro: dict, tamano_lote: int = 500) -> int:
+    """
+    Mueve los documentos que cumplen 'filtro' desde 'origen' a 'destino', por lotes.
+    Primero se copian (upsert) y después se borran, así que si el proceso se
+    corta a la mitad se puede repetir sin perder ni duplicar documentos.
+
+    Cada documento se borra solo si sigue idéntico a la copia archivada. Si
+    cambió entremedio (p. ej. un pedido pagado o un producto reactivado) queda
+    en 'origen': si aún cumple 'filtro' se vuelve a copiar en el siguiente lote,
+    y si ya no lo cumple se descarta la copia vieja del archivo. Si ya no está
+    en 'origen' (otro proceso lo movió), la copia del archivo no se toca.
+    Devuelve la cantidad de documentos movidos.
+    """
+    total = 0
+    while True:
+        lote = await origen.find(filtro).limit(tamano_lote).to_list(length=tamano_lote)
+        if not lote:
+            return total
+
+        movidos = 0
+        for doc in lote:
+            await destino.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+            # El documento completo como filtro: solo borra si nadie lo modificó
+            result = await origen.delete_one(doc)
+            if result.deleted_count:
+                movidos += 1
+                continue
+
+            actual = await origen.find_one({"_id": doc["_id"]})
+            if actual is not None and not await origen.find_one({"_id": doc["_id"], **filtro}, {"_id": 1}):
+                # Sigue vivo pero ya no corresponde archivarlo: la copia sobra
+                await destino.delete_one({"_id": doc["_id"]})
+
+        # Si nada se pudo mover (todo el lote cambiando), se reintenta en la próxima ejecución
+        if not movidos:
+            return total
+
+        total += movidos
+        # Cede el loop entre lotes para no frenar los requests en curso
+        await asyncio.sleep(0)
+
+async def archivar_pedidos(db, settings: Settings) -> int:
+    """Mueve a 'orders_archive' los pedidos con más de archivo_meses_pedidos de antigüedad."""
+    limite = datetime.utcnow() - timedelta(days=30 * settings.archivo_meses_pedidos)
+    return await mover_a_archivo(
+        get_order_collection(db),
+        get_order_archive_collection(db),
+        {"createdAt": {"$lt": limite}},
+        settings.archivo_tamano_lote
+    )
+
+async def archivar_productos(db, settings: Settings) -> int:
+    """Mueve a 'products_archive' los productos inactivos hace más de archivo_meses_productos."""
+    limite = datetime.utcnow() - timedelta(days=30 * settings.archivo_meses_productos)
+    return await mover_a_archivo(
+        get_product_collection(db),
+        get_product_archive_collection(db),
+        {"activo": False, "updatedAt": {"$lt": limite}},
+        settings.archivo_tamano_lote
+    )
+
+# --- Lectura con respaldo en el archivo ---
+
+async def buscar_con_archivo(coleccion, archivo, filtro: dict) -> Optional[dict]:
+    """Busca en la colección principal y, si no está, en su colección de archivo."""
+    documento = await coleccion.find_one(filtro)
+    if documento is None:
+        documento = await archivo.find_one(filtro)
+    return documento
+
+async def restaurar_desde_archivo(coleccion, archivo, filtro: dict) -> Optional[dict]:
+    """
+    Devuelve un documento archivado a su colección principal (p. ej. para
+    editar un producto archivado). Retorna el documento, o None si no está.
+    """
+    documento = await archivo.find_one(filtro)
+    if documento is None:
+        return None
+    await coleccion.replace_one({"_id": documento["_id"]}, documento, upsert=True)
+    await archivo.delete_one({"_id": documento["_id"]})
+    return documento
+
+# --- Tarea Programada ---
+
+LOCK_ARCHIVADO = "archivado"
+
+async def tomar_lease(locks, nombre: str, dueno: str, duracion: timedelta) -> bool:
+    """
+    Intenta tomar (o renovar) el lease 'nombre' en la colección 'locks'.
+    Solo un dueño lo tiene a la vez; si el dueño muere, expira tras 'duracion'.
+    """
+    ahora = datetime.utcnow()
+    try:
+        await locks.find_one_and_update(
+            {"_id": nombre, "$or": [{"hasta": {"$lt": ahora}}, {"dueno": dueno}]},
+            {"$set": {"dueno": dueno, "hasta": ahora + duracion}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # El documento existe y lo tiene otro dueño vigente
+        return False
+
+async def tarea_archivado(database: Database):
+    """
+    Ejecuta el archivado cada archivo_intervalo_horas mientras la app esté arriba.
+    Con varios workers o instancias, solo el que tiene el lease archiva en cada ciclo.
+    """
+    settings = database.settings
+    dueno = uuid4().hex
+    intervalo = timedelta(hours=settings.archivo_intervalo_horas)
+    while True:
+        try:
+            if await tomar_lease(get_lock_collection(database.db), LOCK_ARCHIVADO, dueno, intervalo):
+                pedidos = await archivar_pedidos(database.db, settings)
+                productos = await archivar_productos(database.db, settings)
+                print(f"Archivado: {pedidos} pedidos y {productos} productos movidos.")
+        except Exception as e:
+            print(f"Error en el archivado: {e}")
+        await asyncio.sleep(intervalo.total_seconds())
+
+def iniciar_tarea_archivado(database: Database) -> asyncio.Task:
+    """Lanza la tarea de archivado en segundo plano (al iniciar la app)."""
+    return asyncio.create_task(tarea_archivado(database))
+
+async def detener_tarea_archivado(tarea: Optional[asyncio.Task]):
+    """Cancela la tarea de archivado (al apagar la app)."""
+    if tarea is not None:
+        tarea.cancel()
+        try:
+            await tarea
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,133 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from pymongo.errors import DuplicateKeyError
+
+from .models import ModoSalida
+from .respuestas import PayloadPrecomprimido
+
+# --- Versión del Catálogo ---
+# Contador monotónico guardado en la colección 'counters'. Cada producto
+# creado o modificado queda marcado con la versión en que cambió, lo que
+# permite a los clientes pedir solo los cambios (/productos/cambios?since=N).
+#
+# Junto a la versión se guardan las reservas pendientes ('pendientes'): las
+# versiones que una escritura ya tomó pero todavía no guarda en el producto.
+# Mientras una reserva siga viva, los productos con esa versión o mayores
+# pueden no ser visibles aún, así que la versión estable es la menor pendiente
+# menos uno. Una reserva que nunca se liberó (p. ej. el worker murió) se
+# ignora pasado PLAZO_RESERVA, para que no congele el catálogo.
+
+CONTADOR_CATALOGO = "catalogo"
+PLAZO_RESERVA = timedelta(minutes=1)
+
+async def _reservar_version(counters) -> int:
+    """
+    Incrementa la versión y registra la reserva en una sola escritura.
+    Se condiciona a la versión leída (compare-and-set) y se reintenta si otra
+    escritura ganó, porque la reserva debe llevar el número ya incrementado.
+    """
+    while True:
+        contador = await counters.find_one({"_id": CONTADOR_CATALOGO}, {"version": 1})
+        if contador is None:
+            try:
+                await counters.insert_one({
+                    "_id": CONTADOR_CATALOGO,
+                    "version": 1,
+                    "pendientes": [{"version": 1, "desde": datetime.utcnow()}]
+                })
+                return 1
+            except DuplicateKeyError:
+                continue
+
+        version = contador["version"] + 1
+        result = await counters.update_one(
+            {"_id": CONTADOR_CATALOGO, "version": contador["version"]},
+            {
+                "$set": {"version": version},
+                "$push": {"pendientes": {"version": version, "desde": datetime.utcnow()}}
+            }
+        )
+        if result.modified_count:
+            return version
+
+@asynccontextmanager
+async def nueva_version_catalogo(counters):
+    """
+    Reserva la siguiente versión del catálogo para una escritura.
+    Usar como 'async with nueva_version_catalogo(counters) as version:' y
+    escribir el producto dentro del bloque; al salir se libera la reserva.
+    """
+    version = await _reservar_version(counters)
+    try:
+        yield version
+    finally:
+        await counters.update_one(
+            {"_id": CONTADOR_CATALOGO},
+            {"$pull": {"pendientes": {"version": version}}}
+        )
+        # De paso se limpian las reservas abandonadas
+        await counters.update_one(
+            {"_id": CONTADOR_CATALOGO},
+            {"$pull": {"pendientes": {"desde": {"$lt": datetime.utcnow() - PLAZO_RESERVA}}}}
+        )
+
+async def version_estable_catalogo(counters) -> Tuple[int, bool]:
+    """
+    Devuelve (version, completa): la mayor versión cuyos productos ya son
+    todos visibles (0 si el catálogo nunca se ha modificado), y si coincide con
+    la versión actual, es decir, si no hay escrituras en curso.
+    """
+    contador = await counters.find_one({"_id": CONTADOR_CATALOGO})
+    if not contador:
+        return 0, True
+
+    limite = datetime.utcnow() - PLAZO_RESERVA
+    vivas = [p["version"] for p in contador.get("pendientes", []) if p["desde"] >= limite]
+    if vivas:
+        return min(vivas) - 1, False
+    return contador["version"], True
+
+# --- Cache del JSON del Catálogo ---
+
+class CatalogoCache:
+    """
+    Guarda en memoria el JSON del catálogo (ya serializado y comprimido)
+    asociado a la versión del catálogo guardada en la BD. Como la versión es
+    persistente, un cambio hecho por otro worker o instancia también invalida
+    la cache: cada payload se comprime una sola vez por versión.
+    Cada app tiene su propia instancia (app.state.catalogo_cache).
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._payloads: Dict[ModoSalida, PayloadPrecomprimido] = {}
+
+    def obtener(self, version: Optional[int], modo: ModoSalida) -> Optional[PayloadPrecomprimido]:
+        if version is None or version != self.version:
+            return None
+        return self._payloads.get(modo)
+
+    def guardar(self, version: Optional[int], modo: ModoSalida, cuerpo: bytes) -> PayloadPrecomprimido:
+        """
+        Guarda el cuerpo leído en 'version'. Una versión nueva descarta las
+        anteriores; un request lento con una versión vieja no pisa la cache.
+        Con version=None (p. ej. con escrituras en curso) el payload no se cachea.
+        Solo los payloads cacheados se comprimen al nivel más alto.
+        """
+        if version is not None and (self.version is None or version > self.version):
+            self.version = version
+            self._payloads = {}
+        if version is None or version != self.version:
+            return PayloadPrecomprimido(cuerpo)
+
+        payload = PayloadPrecomprimido(cuerpo, nivel_alto=True)
+        self._payloads[modo] = payload
+        return payload
+
+# --- Dependencia ---
+
+def get_catalogo_cache(request: Request) -> CatalogoCache:
+    """Devuelve la cache del catálogo de la app que está atendiendo el request."""
+    return request.app.state.catalogo_cache
@@ -0,0 +1,78 @@
+import os
+from typing import List
+from dotenv import load_dotenv
+from fastapi import Request
+from pydantic import BaseModel, Field
+
+# --- Configuración de la Aplicación ---
+
+class Settings(BaseModel):
+    """
+    Toda la configuración de la app en un solo objeto tipado.
+    Se pasa a create_app(), así se pueden levantar varias apps en el mismo
+    proceso (tests, benchmarks) cada una con su propia base de datos.
+    """
+    # Base de datos
+    mongo_url: str
+    database_name: str
+
+    # Seguridad (JWT)
+    jwt_secret_key: str
+    jwt_algorithm: str
+    access_token_expire_minutes: int = 30
+
+    # CORS
+    cors_origins: List[str] = Field(default_factory=lambda: [
+        "http://localhost",
+        "http://localhost:8080",
+        "http://127.0.0.1:5500", # Puerto común de Live Server en VSCode
+        "null", # Para permitir archivos locales (file://)
+        # Deberías añadir aquí el dominio de tu frontend si lo despliegas
+    ])
+
+    # Compresión de respuestas (bytes)
+    tamano_minimo_compresion: int = 500
+
+    # Archivado de pedidos y productos.
+    # Cada worker de uvicorn lanza su propia tarea, pero se coordinan con un
+    # lease en la colección 'locks': en cada ciclo archiva uno solo.
+    archivo_activo: bool = True
+    archivo_meses_pedidos: int = 12
+    archivo_meses_productos: int = 6
+    archivo_tamano_lote: int = 500
+    archivo_intervalo_horas: float = 24
+
+    @classmethod
+    def desde_entorno(cls) -> "Settings":
+        """
+        Construye la configuración a partir de las variables de entorno (.env).
+        Cada campo se lee de la variable con su nombre en mayúsculas (p. ej.
+        ARCHIVO_ACTIVO); las que no están definidas usan el valor por defecto
+        del modelo. Pydantic convierte los textos a int/float/bool.
+        """
+        load_dotenv()
+
+        datos = {}
+        for campo in cls.model_fields:
+            valor = os.getenv(campo.upper())
+            if valor:
+                datos[campo] = valor
+
+        if "mongo_url" not in datos:
+            raise ValueError("No se encontró la variable MONGO_URL en .env")
+        if "database_name" not in datos:
+            raise ValueError("No se encontró la variable DATABASE_NAME en .env")
+        if "jwt_secret_key" not in datos or "jwt_algorithm" not in datos:
+            raise ValueError("Variables de entorno JWT no configuradas correctamente.")
+
+        if "cors_origins" in datos:
+            # Lista separada por comas, p. ej. "http://localhost,https://mitienda.cl"
+            datos["cors_origins"] = [o.strip() for o in datos["cors_origins"].split(",") if o.strip()]
+
+        return cls(**datos)
+
+# --- Dependencia ---
+
+def get_settings(request: Request) -> Settings:
+    """Devuelve la configuración de la app que está atendiendo el request."""
+    return request.app.state.settings
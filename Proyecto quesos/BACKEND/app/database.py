@@ -1,53 +1,76 @@
-import os
-from dotenv import load_dotenv
+from typing import Optional
+from fastapi import Depends, Request
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
-# Cargar variables de entorno desde .env
-load_dotenv()
-
-MONGO_URL = os.getenv("MONGO_URL")
-DATABASE_NAME = os.getenv("DATABASE_NAME")
-
-if not MONGO_URL:
-    raise ValueError("No se encontró la variable MONGO_URL en .env")
-if not DATABASE_NAME:
-    raise ValueError("No se encontró la variable DATABASE_NAME en .env")
+from .config import Settings
 
 class Database:
-    client: AsyncIOMotorClient = None
-    db: AsyncIOMotorDatabase = None
+    """
+    Conexión a MongoDB de una instancia de la app (se guarda en app.state.db).
+    Se puede pasar un 'client' ya creado (p. ej. un doble local para tests);
+    en ese caso la app lo usa pero no lo cierra.
+    """
 
-db = Database()
+    def __init__(self, settings: Settings, client: Optional[AsyncIOMotorClient] = None):
+        self.settings = settings
+        self.client = client
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._client_propio = client is None
 
-async def connect_to_mongo():
+async def connect_to_mongo(database: Database):
     """Conecta a la base de datos MongoDB al iniciar la app."""
+    settings = database.settings
     print("Conectando a MongoDB...")
-    db.client = AsyncIOMotorClient(MONGO_URL)
-    db.db = db.client[DATABASE_NAME]
+    if database.client is None:
+        database.client = AsyncIOMotorClient(settings.mongo_url)
+    database.db = database.client[settings.database_name]
     try:
-        await db.client.admin.command('ping')
-        print(f"¡Conexión exitosa a MongoDB! (Base de datos: {DATABASE_NAME})")
+        await database.client.admin.command('ping')
+        print(f"¡Conexión exitosa a MongoDB! (Base de datos: {settings.database_name})")
+        # Índice para la sincronización incremental del catálogo (/productos/cambios)
+        await database.db["products"].create_index("version")
+        await database.db["products_archive"].create_index("version")
+        # Índice para que el archivado encuentre rápido los pedidos antiguos
+        await database.db["orders"].create_index("createdAt")
+        # Índice para el historial de pedidos, que también consulta el archivo
+        await database.db["orders_archive"].create_index("userId")
     except Exception as e:
         print(f"Error al conectar a MongoDB: {e}")
 
-async def close_mongo_connection():
+async def close_mongo_connection(database: Database):
     """Cierra la conexión a MongoDB al apagar la app."""
     print("Cerrando conexión con MongoDB...")
-    db.client.close()
+    if database._client_propio and database.client is not None:
+        database.client.close()
 
-def get_database() -> AsyncIOMotorDatabase:
-    """Devuelve la instancia de la base de datos."""
-    if db.db is None:
+# --- Dependencias ---
+
+def get_database(request: Request) -> AsyncIOMotorDatabase:
+    """Devuelve la base de datos de la app que está atendiendo el request."""
+    db = request.app.state.db.db
+    if db is None:
         raise Exception("La base de datos no está inicializada. Asegúrate de llamar a connect_to_mongo().")
-    return db.db
+    return db
 
 # Colecciones
-# Esto es un atajo para acceder fácil a las colecciones
-def get_user_collection():
-    return get_database()["users"]
+# Esto es un atajo para acceder fácil a las colecciones (usar con Depends)
+def get_user_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return db["users"]
+
+def get_product_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return db["products"]
+
+def get_order_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return db["orders"]
+
+def get_product_archive_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return db["products_archive"]
+
+def get_order_archive_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return db["orders_archive"]
 
-def get_product_collection():
-    return get_database()["products"]
+def get_counter_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return db["counters"]
 
-def get_order_collection():
-    return get_database()["orders"]
\ No newline at end of file
+def get_lock_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return db["locks"]
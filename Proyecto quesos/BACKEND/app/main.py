@@ -1,53 +1,82 @@
+from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from motor.motor_asyncio import AsyncIOMotorClient
 
-from .database import connect_to_mongo, close_mongo_connection
+from .config import Settings
+from .database import Database, connect_to_mongo, close_mongo_connection
+from .catalogo import CatalogoCache
+from .respuestas import CompresionMiddleware
+from .archivo import iniciar_tarea_archivado, detener_tarea_archivado
 from .routers import productos, usuarios, pedidos
 
-# Crear la aplicación FastAPI
-app = FastAPI(
-    title="Queso & Sabor API",
-    description="Backend para el MVP de la tienda de quesos.",
-    version="1.0.0"
-)
-
-# --- Configuración de CORS ---
-# ¡MUY IMPORTANTE! Esto permite que tu frontend (HTML)
-# se comunique con este backend.
-origins = [
-    "http://localhost",
-    "http://localhost:8080",
-    "http://127.0.0.1:5500", # Puerto común de Live Server en VSCode
-    "null", # Para permitir archivos locales (file://)
-    # Deberías añadir aquí el dominio de tu frontend si lo despliegas
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"], # Permite todos los métodos (GET, POST, PUT, etc.)
-    allow_headers=["*"], # Permite todos los headers
-)
-
-# --- Eventos de Ciclo de Vida (Startup/Shutdown) ---
-
-@app.on_event("startup")
-async def startup_event():
-    await connect_to_mongo()
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    await close_mongo_connection()
-
-# --- Inclusión de Routers ---
-
-app.include_router(usuarios.router)
-app.include_router(productos.router)
-app.include_router(pedidos.router)
-
-# --- Endpoint Raíz ---
-
-@app.get("/", tags=["Root"])
-async def read_root():
-    return {"proyecto": "API de Queso & Sabor v1.0"}
\ No newline at end of file
+def create_app(settings: Optional[Settings] = None, client: Optional[AsyncIOMotorClient] = None) -> FastAPI:
+    """
+    Crea una instancia de la API con su propia configuración, conexión a la BD,
+    cache del catálogo y tarea de archivado (todo guardado en app.state).
+    Sin 'settings' se lee la configuración desde .env.
+    'client' permite usar un cliente de MongoDB ya creado (tests, benchmarks).
+
+    Para levantar el servidor: uvicorn app.main:create_app --factory
+    """
+    if settings is None:
+        settings = Settings.desde_entorno()
+
+    # Crear la aplicación FastAPI
+    app = FastAPI(
+        title="Queso & Sabor API",
+        description="Backend para el MVP de la tienda de quesos.",
+        version="1.0.0",
+        # Documenta las respuestas con los campos con valor por defecto como opcionales,
+        # porque los modos 'sin_nulos'/'compacto' pueden omitirlos.
+        separate_input_output_schemas=False
+    )
+
+    # --- Estado de esta instancia (se inyecta con Depends) ---
+    app.state.settings = settings
+    app.state.db = Database(settings, client)
+    app.state.catalogo_cache = CatalogoCache()
+    app.state.tarea_archivado = None
+
+    # --- Configuración de CORS ---
+    # ¡MUY IMPORTANTE! Esto permite que tu frontend (HTML)
+    # se comunique con este backend. Los orígenes están en Settings.cors_origins.
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"], # Permite todos los métodos (GET, POST, PUT, etc.)
+        allow_headers=["*"], # Permite todos los headers
+    )
+
+    # --- Compresión de respuestas ---
+    # Comprime con br/gzip según Accept-Encoding las respuestas sobre el mínimo configurado.
+    app.add_middleware(CompresionMiddleware, minimo=settings.tamano_minimo_compresion)
+
+    # --- Eventos de Ciclo de Vida (Startup/Shutdown) ---
+
+    @app.on_event("startup")
+    async def startup_event():
+        await connect_to_mongo(app.state.db)
+        # Mueve pedidos antiguos y productos inactivos a las colecciones de archivo
+        if settings.archivo_activo:
+            app.state.tarea_archivado = iniciar_tarea_archivado(app.state.db)
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await detener_tarea_archivado(app.state.tarea_archivado)
+        await close_mongo_connection(app.state.db)
+
+    # --- Inclusión de Routers ---
+
+    app.include_router(usuarios.router)
+    app.include_router(productos.router)
+    app.include_router(pedidos.router)
+
+    # --- Endpoint Raíz ---
+
+    @app.get("/", tags=["Root"])
+    async def read_root():
+        return {"proyecto": "API de Queso & Sabor v1.0"}
+
+    return app
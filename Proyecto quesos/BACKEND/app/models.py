@@ -42,6 +42,14 @@ class PyObjectId(ObjectId):
         }
 
 
+# --- Modos de Salida (tamaño de las respuestas JSON) ---
+
+class ModoSalida(str, Enum):
+    COMPLETO = "completo"     # Todos los campos (comportamiento original)
+    SIN_NULOS = "sin_nulos"   # Omite los campos en null
+    COMPACTO = "compacto"     # Omite nulls y además descripcion/imagen vacías
+
+
 # --- Modelos de Usuario (US-16, US-17, US-18) ---
 
 class Direccion(BaseModel):
@@ -100,6 +108,7 @@ class ProductoCreate(ProductoBase):
 
 class ProductoInDB(ProductoCreate):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    version: int = 0 # Versión del catálogo en que se creó/modificó por última vez
     
     model_config = ConfigDict(
         json_encoders={ObjectId: str},
@@ -117,6 +126,12 @@ class ProductoUpdate(BaseModel):
     activo: Optional[bool] = None
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
+class CambiosCatalogo(BaseModel):
+    """Respuesta de la sincronización incremental del catálogo."""
+    version: int                     # Versión a enviar como 'since' la próxima vez
+    productos: List[ProductoInDB]    # Productos activos creados o modificados
+    eliminados: List[str]            # IDs desactivados (activo=False) desde 'since'
+
 
 # --- Modelos de Pedido (US-04, 06, 10, 11, 12) ---
 
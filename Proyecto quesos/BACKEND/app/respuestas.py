@@ -0,0 +1,178 @@
+import gzip
+import json
+from typing import Dict, Iterable, Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+
+from .models import ModoSalida
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# --- Configuración de Compresión ---
+
+# Orden de preferencia cuando el cliente acepta varias codificaciones
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Campos solo de presentación que el modo compacto omite cuando vienen vacíos.
+# Los demás valores por defecto (activo, status, version...) sí significan algo.
+CAMPOS_PRESENTACION = ("descripcion", "imagen")
+
+# --- Negociación y Compresión ---
+
+def elegir_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la codificación a usar según el header Accept-Encoding.
+    Respeta los pesos 'q' del cliente; en caso de empate prefiere br sobre gzip.
+    """
+    pesos: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        token, _, params = parte.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        pesos[token] = q
+
+    mejor, mejor_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = pesos.get(encoding, pesos.get("*", 0.0))
+        if q > mejor_q:
+            mejor, mejor_q = encoding, q
+    return mejor
+
+def comprimir(cuerpo: bytes, encoding: str, nivel_alto: bool = False) -> bytes:
+    """
+    Comprime el cuerpo con la codificación indicada.
+    'nivel_alto' se usa para payloads que se comprimen una sola vez y se reutilizan.
+    """
+    if encoding == "br":
+        return brotli.compress(cuerpo, quality=11 if nivel_alto else 5)
+    if encoding == "gzip":
+        return gzip.compress(cuerpo, compresslevel=9 if nivel_alto else 6, mtime=0)
+    raise ValueError(f"Codificación no soportada: {encoding}")
+
+# --- Serialización ---
+
+def serializar(modelos: Iterable[BaseModel], modo: ModoSalida = ModoSalida.COMPLETO) -> bytes:
+    """Convierte una lista de modelos a JSON compacto, aplicando el modo de salida."""
+    excluir_nulos = modo != ModoSalida.COMPLETO
+    datos = [m.model_dump(mode="json", by_alias=True, exclude_none=excluir_nulos) for m in modelos]
+
+    if modo == ModoSalida.COMPACTO:
+        for dato in datos:
+            for campo in CAMPOS_PRESENTACION:
+                if dato.get(campo) == "":
+                    del dato[campo]
+
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class PayloadPrecomprimido:
+    """
+    Un cuerpo JSON que guarda sus versiones comprimidas.
+    Cada codificación se calcula la primera vez que se pide y luego se reutiliza.
+    Con nivel_alto=True (solo para payloads que se cachean) se comprime al
+    máximo, porque el costo se paga una vez y no en cada request.
+    """
+
+    def __init__(self, cuerpo: bytes, nivel_alto: bool = False):
+        self.cuerpo = cuerpo
+        self.nivel_alto = nivel_alto
+        self._comprimidos: Dict[str, bytes] = {}
+
+    def comprimido(self, encoding: str) -> bytes:
+        if encoding not in self._comprimidos:
+            self._comprimidos[encoding] = comprimir(self.cuerpo, encoding, nivel_alto=self.nivel_alto)
+        return self._comprimidos[encoding]
+
+def respuesta_json(
+    payload: PayloadPrecomprimido,
+    encoding: Optional[str],
+    minimo: int
+) -> Response:
+    """
+    Arma la respuesta HTTP para un payload precomprimido.
+    Cuerpos más pequeños que 'minimo' (settings.tamano_minimo_compresion)
+    se envían sin comprimir: no vale la pena el CPU.
+    Como ya trae Content-Encoding, el middleware no la vuelve a comprimir.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is None or len(payload.cuerpo) < minimo:
+        return Response(content=payload.cuerpo, media_type="application/json", headers=headers)
+
+    headers["Content-Encoding"] = encoding
+    return Response(
+        content=payload.comprimido(encoding),
+        media_type="application/json",
+        headers=headers
+    )
+
+# --- Middleware ---
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI que comprime (br/gzip) las respuestas según Accept-Encoding.
+    Las respuestas de esta API son JSON pequeños, así que se arma el cuerpo
+    completo antes de decidir si supera 'minimo'. Las que ya traen
+    Content-Encoding (p. ej. el catálogo precomprimido) pasan sin tocar.
+    """
+
+    def __init__(self, app, minimo: int):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = elegir_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        partes = []
+        pasar_directo = False
+
+        async def enviar(message):
+            nonlocal inicio, pasar_directo
+
+            if message["type"] == "http.response.start":
+                if "content-encoding" in Headers(raw=message["headers"]):
+                    pasar_directo = True
+                    await send(message)
+                else:
+                    inicio = message
+                return
+
+            if pasar_directo or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            partes.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            cuerpo = b"".join(partes)
+            headers = MutableHeaders(raw=inicio["headers"])
+            if len(cuerpo) >= self.minimo:
+                cuerpo = comprimir(cuerpo, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(cuerpo))
+                headers.add_vary_header("Accept-Encoding")
+
+            await send(inicio)
+            await send({"type": "http.response.body", "body": cuerpo})
+
+        await self.app(scope, receive, enviar)
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import JSONResponse, Response
 from typing import List, Dict
+from datetime import datetime
 from bson import ObjectId
 
-from ..models import PedidoCreate, PedidoInDB, UsuarioInDB
-from ..database import get_order_collection
-from ..services import get_current_active_user
+from ..models import PedidoCreate, PedidoInDB, UsuarioInDB, ModoSalida
+from ..database import get_order_collection, get_order_archive_collection
+from ..services import get_current_active_user, get_current_admin_user
+from ..respuestas import serializar
 
 router = APIRouter(
     prefix="/pedidos",
@@ -18,14 +21,13 @@ router = APIRouter(
 )
 async def create_order(
     pedido_in: PedidoCreate,
+    collection = Depends(get_order_collection),
     current_user: UsuarioInDB = Depends(get_current_active_user) # Opcional si permites invitados
 ):
     """
     Recibe el carrito finalizado y crea la orden en estado 'nuevo' (US-06).
     Esto reemplaza tu 'qs_pending_order' de localStorage.
     """
-    collection = get_order_collection()
-    
     pedido_db = PedidoInDB(
         **pedido_in.dict(),
         userId=current_user.id # Asocia el pedido al usuario logueado
@@ -41,24 +43,42 @@ async def create_order(
 
 
 @router.get("/mis-pedidos",
-    response_model=List[PedidoInDB],
+    response_class=JSONResponse,
+    responses={200: {
+        "model": List[PedidoInDB],
+        "description": "Pedidos del usuario. En modo 'sin_nulos' o 'compacto' se omiten los campos en null."
+    }},
     summary="Obtener historial de pedidos del usuario"
 )
 async def get_my_orders(
+    modo: ModoSalida = ModoSalida.COMPLETO,
+    incluir_archivo: bool = True,
+    collection = Depends(get_order_collection),
+    archive = Depends(get_order_archive_collection),
     current_user: UsuarioInDB = Depends(get_current_active_user)
 ):
     """
     Obtiene la lista de pedidos del usuario logueado (US-10).
+    'modo' permite omitir los campos en null para achicar la respuesta.
+    Incluye los pedidos ya archivados, ordenados junto al resto por fecha;
+    con incluir_archivo=false se devuelven solo los de la colección principal.
     """
-    collection = get_order_collection()
     orders = []
     
     cursor = collection.find({"userId": current_user.id}).sort("createdAt", -1)
     
     async for order in cursor:
         orders.append(PedidoInDB(**order))
+
+    if incluir_archivo:
+        # Los pedidos que un admin eliminó no se muestran al cliente
+        cursor = archive.find({"userId": current_user.id, "status": {"$ne": "eliminado"}})
+        async for order in cursor:
+            orders.append(PedidoInDB(**order))
+        orders.sort(key=lambda o: o.createdAt, reverse=True)
         
-    return orders
+    # La compresión la aplica el middleware (estas respuestas son por usuario)
+    return Response(content=serializar(orders, modo), media_type="application/json")
 
 
 @router.post("/simular_pago",
@@ -67,6 +87,7 @@ async def get_my_orders(
 async def simulate_payment_confirmation(
     orderId: str, 
     status_pago: str, # "ok", "rechazo", "error"
+    collection = Depends(get_order_collection),
     current_user: UsuarioInDB = Depends(get_current_active_user)
 ):
     """
@@ -76,8 +97,6 @@ async def simulate_payment_confirmation(
     if not ObjectId.is_valid(orderId):
         raise HTTPException(status_code=400, detail="ID de pedido inválido")
         
-    collection = get_order_collection()
-    
     # Buscamos el pedido y nos aseguramos que pertenezca al usuario
     order = await collection.find_one({
         "_id": ObjectId(orderId), 
@@ -103,4 +122,33 @@ async def simulate_payment_confirmation(
         {"$set": {"status": new_status}}
     )
     
-    return {"orderId": orderId, "nuevo_status": new_status}
\ No newline at end of file
+    return {"orderId": orderId, "nuevo_status": new_status}
+
+
+@router.delete("/{orderId}",
+    summary="Eliminar (archivar) un pedido (Admin)"
+)
+async def delete_order(
+    orderId: str,
+    collection = Depends(get_order_collection),
+    archive = Depends(get_order_archive_collection),
+    current_admin: UsuarioInDB = Depends(get_current_admin_user)
+):
+    """
+    Borrado lógico: el pedido se mueve a 'orders_archive' con status
+    'eliminado' y la fecha de borrado, así no se pierde el historial.
+    """
+    if not ObjectId.is_valid(orderId):
+        raise HTTPException(status_code=400, detail="ID de pedido inválido")
+
+    order = await collection.find_one({"_id": ObjectId(orderId)})
+    if not order:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado.")
+
+    order["status"] = "eliminado"
+    order["deletedAt"] = datetime.utcnow()
+
+    await archive.replace_one({"_id": order["_id"]}, order, upsert=True)
+    await collection.delete_one({"_id": order["_id"]})
+
+    return {"orderId": orderId, "nuevo_status": "eliminado"}
\ No newline at end of file
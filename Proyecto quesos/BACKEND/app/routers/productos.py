@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Body
+from fastapi import APIRouter, HTTPException, status, Depends, Body, Request, Query
+from fastapi.responses import JSONResponse
 from typing import List
+from datetime import datetime
 from bson import ObjectId
 
-from ..models import ProductoCreate, ProductoInDB, ProductoUpdate
-from ..database import get_product_collection
+from ..models import ProductoCreate, ProductoInDB, ProductoUpdate, ModoSalida, CambiosCatalogo, UsuarioInDB
+from ..config import Settings, get_settings
+from ..database import get_product_collection, get_product_archive_collection, get_counter_collection
 from ..services import get_current_admin_user
+from ..archivo import buscar_con_archivo, restaurar_desde_archivo
+from ..catalogo import CatalogoCache, get_catalogo_cache, nueva_version_catalogo, version_estable_catalogo
+from ..respuestas import elegir_encoding, respuesta_json, serializar
 
 router = APIRouter(
     prefix="/productos",
@@ -18,16 +24,19 @@ router = APIRouter(
 )
 async def create_product(
     producto: ProductoCreate,
+    collection = Depends(get_product_collection),
+    counters = Depends(get_counter_collection),
     # current_admin: UsuarioInDB = Depends(get_current_admin_user) # Descomentar para proteger
 ):
     """
     Crea un nuevo producto en la base de datos (US-13).
     *Protegido: Solo Admin.*
     """
-    collection = get_product_collection()
-    
-    # Insertar en la base de datos
-    result = await collection.insert_one(producto.dict())
+    # Insertar en la base de datos, marcado con la nueva versión del catálogo
+    producto_dict = producto.dict()
+    async with nueva_version_catalogo(counters) as version:
+        producto_dict["version"] = version
+        result = await collection.insert_one(producto_dict)
     
     # Recuperar el producto insertado para devolverlo
     new_product = await collection.find_one({"_id": result.inserted_id})
@@ -37,37 +46,111 @@ async def create_product(
     raise HTTPException(status_code=400, detail="No se pudo crear el producto.")
 
 @router.get("/", 
-    response_model=List[ProductoInDB],
+    response_class=JSONResponse,
+    responses={200: {
+        "model": List[ProductoInDB],
+        "description": "Productos activos. En modo 'sin_nulos' se omiten los campos en null; "
+                       "en 'compacto' además descripcion/imagen cuando vienen vacías."
+    }},
     summary="Listar todos los productos"
 )
-async def get_all_products():
+async def get_all_products(
+    request: Request,
+    modo: ModoSalida = ModoSalida.COMPLETO,
+    collection = Depends(get_product_collection),
+    counters = Depends(get_counter_collection),
+    catalogo_cache: CatalogoCache = Depends(get_catalogo_cache),
+    settings: Settings = Depends(get_settings)
+):
     """
     Obtiene la lista de todos los productos activos (US-01, US-02, US-03).
+    El JSON se cachea y comprime una vez por versión del catálogo.
+    'modo' permite omitir nulls y descripcion/imagen vacías para achicar la respuesta.
     *Abierto al público.*
     """
-    collection = get_product_collection()
-    products = []
-    cursor = collection.find({"activo": True})
-    
-    async for prod in cursor:
-        products.append(ProductoInDB(**prod))
+    encoding = elegir_encoding(request.headers.get("accept-encoding", ""))
+
+    # La versión vive en la BD: así los cambios hechos por otros workers también invalidan
+    version, completa = await version_estable_catalogo(counters)
+    # Con escrituras en curso lo leído puede traer parte de ellas: no se cachea
+    if not completa:
+        version = None
+    payload = catalogo_cache.obtener(version, modo)
+    if payload is None:
+        products = []
+        cursor = collection.find({"activo": True})
         
-    return products
+        async for prod in cursor:
+            products.append(ProductoInDB(**prod))
+
+        payload = catalogo_cache.guardar(version, modo, serializar(products, modo))
+        
+    return respuesta_json(payload, encoding, settings.tamano_minimo_compresion)
+
+@router.get("/cambios",
+    response_model=CambiosCatalogo,
+    summary="Cambios del catálogo desde una versión (sincronización)"
+)
+async def get_product_changes(
+    since: int = Query(0, ge=0),
+    collection = Depends(get_product_collection),
+    archive = Depends(get_product_archive_collection),
+    counters = Depends(get_counter_collection)
+):
+    """
+    Devuelve solo los productos creados, modificados o desactivados después
+    de la versión 'since', para que el frontend actualice su copia local
+    sin descargar todo el catálogo. Con since=0 se obtiene el catálogo completo
+    (incluidos los productos anteriores a la versión, que no tienen 'version').
+    *Abierto al público.*
+    """
+    # La versión estable se lee antes que los productos: así todo producto con
+    # versión <= 'version' ya es visible en la consulta. Lo que cambie
+    # entremedio se repite en la próxima sincronización.
+    # Una versión menor que 'since' indica que la BD se reinició: el cliente
+    # debe descartar su copia y volver a pedir con since=0.
+    version, _ = await version_estable_catalogo(counters)
+
+    productos = []
+    eliminados = []
+    if since == 0:
+        cursor = collection.find({"activo": True})
+    else:
+        cursor = collection.find({"version": {"$gt": since}})
+
+    async for prod in cursor:
+        if prod.get("activo", True):
+            productos.append(ProductoInDB(**prod))
+        else:
+            # Tombstone: solo interesa el ID para borrarlo en el cliente
+            eliminados.append(str(prod["_id"]))
+
+    # Los productos archivados también son tombstones para quien no los había borrado
+    if since > 0:
+        cursor = archive.find({"version": {"$gt": since}}, {"_id": 1})
+        async for prod in cursor:
+            eliminados.append(str(prod["_id"]))
+
+    return CambiosCatalogo(version=version, productos=productos, eliminados=eliminados)
 
 @router.get("/{id}", 
     response_model=ProductoInDB,
     summary="Obtener un producto por ID"
 )
-async def get_product_by_id(id: str):
+async def get_product_by_id(
+    id: str,
+    collection = Depends(get_product_collection),
+    archive = Depends(get_product_archive_collection)
+):
     """
     Obtiene los detalles de un solo producto por su ID (US-03).
+    Si no está en la colección principal, se busca en el archivo.
     *Abierto al público.*
     """
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="ID de producto inválido")
         
-    collection = get_product_collection()
-    product = await collection.find_one({"_id": ObjectId(id)})
+    product = await buscar_con_archivo(collection, archive, {"_id": ObjectId(id)})
     
     if product:
         return ProductoInDB(**product)
@@ -81,16 +164,19 @@ async def get_product_by_id(id: str):
 async def update_product(
     id: str,
     update_data: ProductoUpdate,
+    collection = Depends(get_product_collection),
+    archive = Depends(get_product_archive_collection),
+    counters = Depends(get_counter_collection),
     # current_admin: UsuarioInDB = Depends(get_current_admin_user) # Descomentar para proteger
 ):
     """
     Actualiza el precio, stock, imagen, etc., de un producto (US-14, US-15).
+    Si el producto estaba archivado, primero se devuelve a 'products'
+    (así se puede, por ejemplo, reactivar con activo=True).
     *Protegido: Solo Admin.*
     """
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="ID de producto inválido")
-
-    collection = get_product_collection()
     
     # Construir el objeto de actualización, quitando valores nulos
     update_dict = update_data.dict(exclude_unset=True)
@@ -98,13 +184,66 @@ async def update_product(
     if not update_dict:
         raise HTTPException(status_code=400, detail="No hay datos para actualizar")
 
-    result = await collection.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": update_dict}
-    )
+    # Se verifica antes de reservar versión, para no gastar versiones en IDs inexistentes
+    if not await collection.find_one({"_id": ObjectId(id)}, {"_id": 1}):
+        if not await restaurar_desde_archivo(collection, archive, {"_id": ObjectId(id)}):
+            raise HTTPException(status_code=404, detail=f"Producto con id {id} no encontrado")
+
+    update_dict["updatedAt"] = update_data.updatedAt
+
+    async with nueva_version_catalogo(counters) as version:
+        update_dict["version"] = version
+        result = await collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set": update_dict}
+        )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail=f"Producto con id {id} no encontrado")
         
     updated_product = await collection.find_one({"_id": ObjectId(id)})
-    return ProductoInDB(**updated_product)
\ No newline at end of file
+    return ProductoInDB(**updated_product)
+
+@router.delete("/{id}",
+    response_model=ProductoInDB,
+    summary="Eliminar (desactivar) un producto (Admin)"
+)
+async def delete_product(
+    id: str,
+    collection = Depends(get_product_collection),
+    archive = Depends(get_product_archive_collection),
+    counters = Depends(get_counter_collection),
+    current_admin: UsuarioInDB = Depends(get_current_admin_user)
+):
+    """
+    Borrado lógico: marca el producto como inactivo (activo=False) en vez de
+    eliminarlo. Los clientes lo reciben como eliminado en /productos/cambios
+    y, pasado un tiempo, la tarea de archivado lo mueve a 'products_archive'.
+    Un producto ya archivado ya está inactivo: se devuelve tal cual.
+    *Protegido: Solo Admin.*
+    """
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="ID de producto inválido")
+
+    # Se verifica antes de reservar versión, para no gastar versiones en IDs inexistentes
+    if not await collection.find_one({"_id": ObjectId(id)}, {"_id": 1}):
+        archived_product = await archive.find_one({"_id": ObjectId(id)})
+        if archived_product:
+            return ProductoInDB(**archived_product)
+        raise HTTPException(status_code=404, detail=f"Producto con id {id} no encontrado")
+
+    async with nueva_version_catalogo(counters) as version:
+        result = await collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set": {
+                "activo": False,
+                "updatedAt": datetime.utcnow(),
+                "version": version
+            }}
+        )
+
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail=f"Producto con id {id} no encontrado")
+
+    deleted_product = await collection.find_one({"_id": ObjectId(id)})
+    return ProductoInDB(**deleted_product)
\ No newline at end of file
@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from typing import List
 
 from ..models import UsuarioCreate, UsuarioBase, Token, Direccion, UsuarioInDB
+from ..config import Settings, get_settings
 from ..database import get_user_collection
 from ..services import (
     get_password_hash, 
@@ -20,12 +21,10 @@ router = APIRouter(
     status_code=status.HTTP_201_CREATED,
     summary="Registro de nuevo usuario"
 )
-async def register_user(user_in: UsuarioCreate):
+async def register_user(user_in: UsuarioCreate, collection = Depends(get_user_collection)):
     """
     Crea un nuevo usuario en la base de datos (US-16).
     """
-    collection = get_user_collection()
-    
     # Verificar si el email ya existe
     existing_user = await collection.find_one({"email": user_in.email})
     if existing_user:
@@ -58,11 +57,14 @@ async def register_user(user_in: UsuarioCreate):
     response_model=Token,
     summary="Iniciar sesión"
 )
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    collection = Depends(get_user_collection),
+    settings: Settings = Depends(get_settings)
+):
     """
     Verifica email y contraseña, y devuelve un Token JWT (US-17).
     """
-    collection = get_user_collection()
     user_data = await collection.find_one({"email": form_data.username})
     
     if not user_data:
@@ -81,7 +83,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
         
     # Crear el token JWT
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email}, settings=settings)
     
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -105,13 +107,12 @@ async def read_users_me(current_user: UsuarioInDB = Depends(get_current_active_u
 )
 async def add_direccion_to_user(
     direccion: Direccion,
+    collection = Depends(get_user_collection),
     current_user: UsuarioInDB = Depends(get_current_active_user)
 ):
     """
     Añade una nueva dirección a la lista del usuario (US-18).
     """
-    collection = get_user_collection()
-    
     # Si es la primera, marcarla como principal
     if not current_user.direcciones:
         direccion.principal = True
@@ -1,4 +1,3 @@
-import os
 from datetime import datetime, timedelta
 from typing import Optional
 from passlib.context import CryptContext
@@ -7,18 +6,12 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import EmailStr
 
+from .config import Settings, get_settings
 from .database import get_user_collection
 from .models import UsuarioInDB, TokenData
 
 # --- Configuración de Seguridad ---
-
-# Cargar desde .env
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
-JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
-
-if not JWT_SECRET_KEY or not JWT_ALGORITHM:
-    raise ValueError("Variables de entorno JWT no configuradas correctamente.")
+# Las claves JWT vienen de Settings (ver config.py), no de variables globales.
 
 # Esquema de autenticación
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -38,21 +31,25 @@ def get_password_hash(password: str) -> str:
 
 # --- Funciones de Token (JWT) ---
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+def create_access_token(data: dict, settings: Settings, expires_delta: Optional[timedelta] = None) -> str:
     """Crea un nuevo token JWT."""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 # --- Dependencia de Autenticación ---
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> UsuarioInDB:
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    settings: Settings = Depends(get_settings),
+    users = Depends(get_user_collection)
+) -> UsuarioInDB:
     """
     Dependencia de FastAPI para obtener el usuario actual.
     Decodifica el token JWT y busca al usuario en la BD.
@@ -64,7 +61,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UsuarioInDB:
     )
     
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         email: str = payload.get("sub") # "sub" (subject) es nuestro email
         if email is None:
             raise credentials_exception
@@ -72,7 +69,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UsuarioInDB:
     except JWTError:
         raise credentials_exception
 
-    user_data = await get_user_collection().find_one({"email": token_data.email})
+    user_data = await users.find_one({"email": token_data.email})
     
     if user_data is None:
         raise credentials_exception
@@ -0,0 +1,83 @@
+"""
+Pruebas de humo: varias instancias de la app en el mismo proceso, cada una
+con su propia configuración, base de datos (mongomock) y cache del catálogo.
+"""
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config import Settings
+from app.main import create_app
+from app.services import create_access_token
+
+PRODUCTO = {"nombre": "Gouda", "precio": 5990, "stock": 3, "leche": "vaca"}
+
+
+def crear_settings(**extra) -> Settings:
+    datos = dict(
+        mongo_url="mongodb://local",
+        database_name="quesos_test",
+        jwt_secret_key="clave-de-prueba",
+        jwt_algorithm="HS256",
+        archivo_activo=False,
+    )
+    datos.update(extra)
+    return Settings(**datos)
+
+
+def test_apps_con_bd_distinta_no_comparten_datos():
+    app1 = create_app(crear_settings(), AsyncMongoMockClient())
+    app2 = create_app(crear_settings(), AsyncMongoMockClient())
+
+    with TestClient(app1) as c1, TestClient(app2) as c2:
+        assert c1.post("/productos/", json=PRODUCTO).status_code == 201
+
+        assert len(c1.get("/productos/").json()) == 1
+        assert c2.get("/productos/").json() == []
+        assert c1.get("/productos/cambios").json()["version"] == 1
+        assert c2.get("/productos/cambios").json()["version"] == 0
+
+    assert app1.state.catalogo_cache is not app2.state.catalogo_cache
+
+
+def test_cada_app_usa_su_propia_clave_jwt():
+    client = AsyncMongoMockClient()
+    app1 = create_app(crear_settings(jwt_secret_key="clave-1"), client)
+    app2 = create_app(crear_settings(jwt_secret_key="clave-2"), client)
+
+    with TestClient(app1) as c1, TestClient(app2) as c2:
+        c1.portal.call(client["quesos_test"]["users"].insert_one, {
+            "_id": ObjectId(), "email": "ana@queso.cl", "nombre": "Ana", "hashed_password": "x"
+        })
+        token = create_access_token({"sub": "ana@queso.cl"}, settings=app1.state.settings)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        assert c1.get("/users/me", headers=headers).status_code == 200
+        assert c2.get("/users/me", headers=headers).status_code == 401
+
+
+def test_cache_del_catalogo_se_invalida_entre_instancias():
+    # Dos instancias (p. ej. dos workers) sobre la misma BD
+    client = AsyncMongoMockClient()
+    app1 = create_app(crear_settings(), client)
+    app2 = create_app(crear_settings(), client)
+
+    with TestClient(app1) as c1, TestClient(app2) as c2:
+        ids = [c1.post("/productos/", json=PRODUCTO).json()["_id"] for _ in range(2)]
+        assert len(c2.get("/productos/").json()) == 2
+
+        c1.put(f"/productos/{ids[0]}", json={"activo": False})
+        assert len(c2.get("/productos/").json()) == 1
+
+
+@pytest.mark.parametrize("accept, esperado", [("gzip", "gzip"), ("identity", None)])
+def test_catalogo_comprimido_segun_accept_encoding(accept, esperado):
+    app = create_app(crear_settings(tamano_minimo_compresion=10), AsyncMongoMockClient())
+
+    with TestClient(app) as c:
+        c.post("/productos/", json=PRODUCTO)
+        r = c.get("/productos/", headers={"Accept-Encoding": accept})
+
+        assert r.headers.get("content-encoding") == esperado
+        assert r.json()[0]["nombre"] == "Gouda"
@@ -0,0 +1,266 @@
+"""
+Pruebas del archivado: movimiento entre colecciones (con cambios concurrentes),
+la tarea programada y los endpoints que leen, borran o restauran del archivo.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.archivo import (
+    archivar_pedidos,
+    archivar_productos,
+    mover_a_archivo,
+    tomar_lease,
+)
+from app.main import create_app
+from app.services import create_access_token
+
+from test_aislamiento import PRODUCTO, crear_settings
+
+ANTIGUO = datetime.utcnow() - timedelta(days=800)
+FILTRO = {"viejo": True}
+
+
+class DestinoConEfecto:
+    """Colección destino que ejecuta 'efecto' justo después de la primera copia."""
+
+    def __init__(self, coleccion, efecto):
+        self._coleccion = coleccion
+        self._efecto = efecto
+
+    def __getattr__(self, nombre):
+        return getattr(self._coleccion, nombre)
+
+    async def replace_one(self, *args, **kwargs):
+        result = await self._coleccion.replace_one(*args, **kwargs)
+        if self._efecto is not None:
+            efecto, self._efecto = self._efecto, None
+            await efecto()
+        return result
+
+
+def colecciones():
+    db = AsyncMongoMockClient()["quesos_test"]
+    return db, db["origen"], db["destino"]
+
+
+def pedido(user_id, creado, status="nuevo") -> dict:
+    return {
+        "_id": ObjectId(), "userId": user_id, "createdAt": creado, "status": status,
+        "buyer": {"nombre": "Ana", "email": "ana@queso.cl", "dire": "Calle 1"},
+        "items": {}, "subtotal": 1000, "shipping": 0, "total": 1000,
+        "shippingMethod": "retiro", "shippingDetail": {},
+    }
+
+
+def crear_usuario(c, client, rol="CLIENTE") -> dict:
+    user_id = ObjectId()
+    email = f"{rol.lower()}@queso.cl"
+    c.portal.call(client["quesos_test"]["users"].insert_one, {
+        "_id": user_id, "email": email, "nombre": rol, "hashed_password": "x", "rol": rol
+    })
+    token = create_access_token({"sub": email}, settings=c.app.state.settings)
+    return {"id": user_id, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+# --- mover_a_archivo ---
+
+def test_mover_a_archivo_por_lotes():
+    async def probar():
+        _, origen, destino = colecciones()
+        await origen.insert_many([{"n": i, "viejo": i % 2 == 0} for i in range(7)])
+
+        assert await mover_a_archivo(origen, destino, FILTRO, tamano_lote=2) == 4
+        assert await origen.count_documents({}) == 3
+        assert await destino.count_documents(FILTRO) == 4
+        # Repetirlo no mueve ni duplica nada
+        assert await mover_a_archivo(origen, destino, FILTRO, tamano_lote=2) == 0
+        assert await destino.count_documents({}) == 4
+
+    asyncio.run(probar())
+
+
+def test_mover_a_archivo_documento_desaparece_entre_copia_y_borrado():
+    # Otro archivador (o un DELETE de admin) lo movió mientras tanto
+    async def probar():
+        _, origen, destino = colecciones()
+        doc_id = (await origen.insert_one({"viejo": True})).inserted_id
+
+        async def borrar():
+            await origen.delete_one({"_id": doc_id})
+
+        movidos = await mover_a_archivo(origen, DestinoConEfecto(destino, borrar), FILTRO)
+
+        assert movidos == 0
+        assert await destino.find_one({"_id": doc_id}) is not None
+
+    asyncio.run(probar())
+
+
+def test_mover_a_archivo_documento_modificado_que_ya_no_cumple_el_filtro():
+    async def probar():
+        _, origen, destino = colecciones()
+        doc_id = (await origen.insert_one({"viejo": True})).inserted_id
+
+        async def reactivar():
+            await origen.update_one({"_id": doc_id}, {"$set": {"viejo": False}})
+
+        assert await mover_a_archivo(origen, DestinoConEfecto(destino, reactivar), FILTRO) == 0
+        assert await origen.find_one({"_id": doc_id}) is not None
+        assert await destino.find_one({"_id": doc_id}) is None
+
+    asyncio.run(probar())
+
+
+def test_mover_a_archivo_documento_modificado_que_aun_cumple_el_filtro():
+    async def probar():
+        _, origen, destino = colecciones()
+        doc_id = (await origen.insert_one({"viejo": True, "stock": 1})).inserted_id
+
+        async def editar():
+            await origen.update_one({"_id": doc_id}, {"$set": {"stock": 2}})
+
+        # Queda en 'origen' y se vuelve a copiar, con los datos nuevos, en la próxima ejecución
+        assert await mover_a_archivo(origen, DestinoConEfecto(destino, editar), FILTRO) == 0
+        assert await origen.find_one({"_id": doc_id}) is not None
+        assert await mover_a_archivo(origen, destino, FILTRO) == 1
+        assert await origen.find_one({"_id": doc_id}) is None
+        assert (await destino.find_one({"_id": doc_id}))["stock"] == 2
+
+    asyncio.run(probar())
+
+
+# --- archivar_pedidos / archivar_productos ---
+
+def test_archivar_pedidos_y_productos_segun_antiguedad():
+    async def probar():
+        db = AsyncMongoMockClient()["quesos_test"]
+        settings = crear_settings()
+        user_id = ObjectId()
+        await db["orders"].insert_many([pedido(user_id, ANTIGUO), pedido(user_id, datetime.utcnow())])
+        await db["products"].insert_many([
+            {**PRODUCTO, "activo": False, "updatedAt": ANTIGUO},
+            {**PRODUCTO, "activo": False, "updatedAt": datetime.utcnow()},
+            {**PRODUCTO, "activo": True, "updatedAt": ANTIGUO},
+        ])
+
+        assert await archivar_pedidos(db, settings) == 1
+        assert await archivar_productos(db, settings) == 1
+        assert await db["orders"].count_documents({}) == 1
+        assert await db["orders_archive"].count_documents({"createdAt": ANTIGUO}) == 1
+        assert await db["products"].count_documents({}) == 2
+        assert await db["products_archive"].count_documents({"activo": False, "updatedAt": ANTIGUO}) == 1
+
+    asyncio.run(probar())
+
+
+def test_lease_de_archivado_lo_tiene_un_solo_dueno():
+    async def probar():
+        locks = AsyncMongoMockClient()["quesos_test"]["locks"]
+        hora = timedelta(hours=1)
+
+        assert await tomar_lease(locks, "archivado", "worker-1", hora)
+        assert not await tomar_lease(locks, "archivado", "worker-2", hora)
+        # El dueño lo renueva; si expira, otro lo puede tomar
+        assert await tomar_lease(locks, "archivado", "worker-1", -hora)
+        assert await tomar_lease(locks, "archivado", "worker-2", hora)
+
+    asyncio.run(probar())
+
+
+# --- Endpoints ---
+
+def test_delete_producto_lo_desactiva_y_devuelve_el_archivado():
+    client = AsyncMongoMockClient()
+    app = create_app(crear_settings(), client)
+    archivo = client["quesos_test"]["products_archive"]
+
+    with TestClient(app) as c:
+        admin = crear_usuario(c, client, "ADMIN")
+        cliente = crear_usuario(c, client)
+        producto_id = c.post("/productos/", json=PRODUCTO).json()["_id"]
+
+        assert c.delete(f"/productos/{producto_id}", headers=cliente["headers"]).status_code == 403
+
+        r = c.delete(f"/productos/{producto_id}", headers=admin["headers"])
+        assert r.status_code == 200
+        assert r.json()["activo"] is False
+        assert c.get("/productos/").json() == []
+
+        archivado_id = ObjectId()
+        c.portal.call(archivo.insert_one, {**PRODUCTO, "_id": archivado_id, "activo": False})
+        r = c.delete(f"/productos/{archivado_id}", headers=admin["headers"])
+        assert r.status_code == 200
+        assert r.json()["_id"] == str(archivado_id)
+        # No gasta versiones en productos ya archivados ni inexistentes
+        assert c.delete(f"/productos/{ObjectId()}", headers=admin["headers"]).status_code == 404
+        assert c.get("/productos/cambios").json()["version"] == 2
+
+
+def test_get_producto_busca_en_el_archivo():
+    client = AsyncMongoMockClient()
+    app = create_app(crear_settings(), client)
+    archivado_id = ObjectId()
+
+    with TestClient(app) as c:
+        c.portal.call(client["quesos_test"]["products_archive"].insert_one,
+                      {**PRODUCTO, "_id": archivado_id, "activo": False})
+
+        r = c.get(f"/productos/{archivado_id}")
+        assert r.status_code == 200
+        assert r.json()["nombre"] == "Gouda"
+        assert c.get(f"/productos/{ObjectId()}").status_code == 404
+
+
+def test_put_restaura_un_producto_archivado():
+    client = AsyncMongoMockClient()
+    app = create_app(crear_settings(), client)
+    db = client["quesos_test"]
+    archivado_id = ObjectId()
+
+    with TestClient(app) as c:
+        c.portal.call(db["products_archive"].insert_one,
+                      {**PRODUCTO, "_id": archivado_id, "activo": False, "version": 0})
+
+        r = c.put(f"/productos/{archivado_id}", json={"activo": True})
+        assert r.status_code == 200
+        assert r.json()["activo"] is True
+        assert c.portal.call(db["products_archive"].find_one, {"_id": archivado_id}) is None
+        assert [p["_id"] for p in c.get("/productos/").json()] == [str(archivado_id)]
+        assert c.put(f"/productos/{ObjectId()}", json={"activo": True}).status_code == 404
+
+
+def test_delete_pedido_lo_archiva_y_se_oculta_al_cliente():
+    client = AsyncMongoMockClient()
+    app = create_app(crear_settings(), client)
+    db = client["quesos_test"]
+
+    with TestClient(app) as c:
+        admin = crear_usuario(c, client, "ADMIN")
+        cliente = crear_usuario(c, client)
+        reciente = pedido(cliente["id"], datetime.utcnow() - timedelta(days=1))
+        borrado = pedido(cliente["id"], datetime.utcnow())
+        archivado = pedido(cliente["id"], ANTIGUO)
+        nuevo = pedido(cliente["id"], datetime.utcnow() - timedelta(days=2))
+        c.portal.call(db["orders"].insert_many, [reciente, borrado])
+        c.portal.call(db["orders_archive"].insert_one, archivado)
+        # Un pedido archivado más nuevo que uno activo (p. ej. archivado a mano)
+        c.portal.call(db["orders_archive"].insert_one, nuevo)
+
+        r = c.delete(f"/pedidos/{borrado['_id']}", headers=admin["headers"])
+        assert r.status_code == 200
+        assert c.delete(f"/pedidos/{borrado['_id']}", headers=admin["headers"]).status_code == 404
+
+        copia = c.portal.call(db["orders_archive"].find_one, {"_id": borrado["_id"]})
+        assert copia["status"] == "eliminado"
+        assert "deletedAt" in copia
+
+        # Sin el eliminado, y los del archivo mezclados por fecha
+        ids = [p["_id"] for p in c.get("/pedidos/mis-pedidos", headers=cliente["headers"]).json()]
+        assert ids == [str(reciente["_id"]), str(nuevo["_id"]), str(archivado["_id"])]
+
+        r = c.get("/pedidos/mis-pedidos", params={"incluir_archivo": False}, headers=cliente["headers"])
+        assert [p["_id"] for p in r.json()] == [str(reciente["_id"])]
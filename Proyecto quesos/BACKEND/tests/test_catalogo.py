@@ -0,0 +1,133 @@
+"""
+Pruebas de la sincronización incremental del catálogo (/productos/cambios)
+y de las reservas de versión de las escrituras en curso y la cache del catálogo.
+"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.catalogo import CONTADOR_CATALOGO, PLAZO_RESERVA, CatalogoCache
+from app.main import create_app
+from app.models import ModoSalida
+
+from test_aislamiento import PRODUCTO, crear_settings
+
+
+def crear_cliente():
+    client = AsyncMongoMockClient()
+    app = create_app(crear_settings(), client)
+    return TestClient(app), client["quesos_test"]
+
+
+def reservar(c, db, version, desde):
+    """Simula una escritura que reservó 'version' y no la ha liberado."""
+    c.portal.call(db["counters"].update_one, {"_id": CONTADOR_CATALOGO}, {
+        "$set": {"version": version},
+        "$push": {"pendientes": {"version": version, "desde": desde}}
+    })
+
+
+def test_cambios_desde_una_version():
+    c, _ = crear_cliente()
+    with c:
+        ids = [c.post("/productos/", json={**PRODUCTO, "nombre": f"Queso {i}"}).json()["_id"] for i in range(3)]
+        assert c.get("/productos/cambios", params={"since": 3}).json() == {
+            "version": 3, "productos": [], "eliminados": []
+        }
+
+        c.put(f"/productos/{ids[1]}", json={"precio": 6990})
+        r = c.get("/productos/cambios", params={"since": 3}).json()
+        assert r["version"] == 4
+        assert [(p["_id"], p["precio"]) for p in r["productos"]] == [(ids[1], 6990)]
+        assert r["eliminados"] == []
+
+        # Con since=0 llega el catálogo completo
+        assert len(c.get("/productos/cambios").json()["productos"]) == 3
+
+
+def test_cambios_informa_productos_desactivados_y_archivados():
+    c, db = crear_cliente()
+    with c:
+        ids = [c.post("/productos/", json=PRODUCTO).json()["_id"] for _ in range(2)]
+
+        c.put(f"/productos/{ids[0]}", json={"activo": False})
+        # Desactivado y luego archivado (la tarea lo movió a 'products_archive')
+        c.put(f"/productos/{ids[1]}", json={"activo": False})
+        archivado = c.portal.call(db["products"].find_one_and_delete, {"_id": ObjectId(ids[1])})
+        c.portal.call(db["products_archive"].insert_one, archivado)
+
+        r = c.get("/productos/cambios", params={"since": 2}).json()
+        assert r["version"] == 4
+        assert r["productos"] == []
+        assert sorted(r["eliminados"]) == sorted(ids)
+
+        # A quien sincroniza desde cero no se le mandan tombstones
+        assert c.get("/productos/cambios").json() == {"version": 4, "productos": [], "eliminados": []}
+
+
+def test_cambios_desde_cero_incluye_productos_sin_version():
+    c, db = crear_cliente()
+    with c:
+        # Producto creado antes de que existiera el campo 'version'
+        legado_id = c.portal.call(db["products"].insert_one, {**PRODUCTO, "activo": True}).inserted_id
+        nuevo_id = c.post("/productos/", json=PRODUCTO).json()["_id"]
+
+        r = c.get("/productos/cambios").json()
+        assert r["version"] == 1
+        assert sorted(p["_id"] for p in r["productos"]) == sorted([str(legado_id), nuevo_id])
+        assert [p["version"] for p in r["productos"] if p["_id"] == str(legado_id)] == [0]
+
+
+def test_escrituras_en_curso_frenan_la_version():
+    c, db = crear_cliente()
+    with c:
+        c.post("/productos/", json=PRODUCTO)
+        c.get("/productos/")
+        reservar(c, db, 2, datetime.utcnow())
+        # Otra escritura posterior ya terminó y es visible
+        c.post("/productos/", json={**PRODUCTO, "nombre": "Brie"})
+
+        r = c.get("/productos/cambios", params={"since": 1}).json()
+        # La versión 2 sigue pendiente: el cliente avanza solo hasta la 1
+        assert r["version"] == 1
+        assert [p["nombre"] for p in r["productos"]] == ["Brie"]
+
+        # El catálogo se lee igual de la BD, pero no queda en la cache
+        assert len(c.get("/productos/").json()) == 2
+        assert c.app.state.catalogo_cache.version == 1
+
+
+def test_reserva_abandonada_expira():
+    c, db = crear_cliente()
+    with c:
+        c.post("/productos/", json=PRODUCTO)
+        reservar(c, db, 2, datetime.utcnow() - PLAZO_RESERVA - timedelta(seconds=1))
+
+        assert c.get("/productos/cambios").json()["version"] == 2
+        c.get("/productos/")
+        assert c.app.state.catalogo_cache.version == 2
+
+        # La siguiente escritura limpia la reserva vencida
+        c.post("/productos/", json=PRODUCTO)
+        contador = c.portal.call(db["counters"].find_one, {"_id": CONTADOR_CATALOGO})
+        assert contador["version"] == 3
+        assert contador["pendientes"] == []
+
+
+def test_cambios_con_since_mayor_a_la_version_del_servidor():
+    # P. ej. la BD se reinició: el cliente lo detecta porque la versión retrocede
+    c, _ = crear_cliente()
+    with c:
+        c.post("/productos/", json=PRODUCTO)
+        assert c.get("/productos/cambios", params={"since": 50}).json()["version"] == 1
+
+
+def test_solo_el_catalogo_cacheado_se_comprime_al_nivel_alto():
+    cache = CatalogoCache()
+
+    assert cache.guardar(3, ModoSalida.COMPLETO, b"[]").nivel_alto
+    assert not cache.guardar(None, ModoSalida.COMPLETO, b"[]").nivel_alto
+    # Un request lento con una versión vieja no se cachea
+    assert not cache.guardar(2, ModoSalida.COMPLETO, b"[]").nivel_alto
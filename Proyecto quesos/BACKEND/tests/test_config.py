@@ -0,0 +1,53 @@
+"""
+Pruebas de la lectura de la configuración desde variables de entorno.
+"""
+import pytest
+
+from app import config
+from app.config import Settings
+
+OBLIGATORIAS = {
+    "MONGO_URL": "mongodb://local",
+    "DATABASE_NAME": "quesos_test",
+    "JWT_SECRET_KEY": "clave-de-prueba",
+    "JWT_ALGORITHM": "HS256",
+}
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    # Solo cuentan las variables que define cada prueba, no el .env local
+    monkeypatch.setattr(config, "load_dotenv", lambda: None)
+    for campo in Settings.model_fields:
+        monkeypatch.delenv(campo.upper(), raising=False)
+    for nombre, valor in OBLIGATORIAS.items():
+        monkeypatch.setenv(nombre, valor)
+    return monkeypatch
+
+
+def test_variables_no_definidas_usan_los_valores_del_modelo(entorno):
+    settings = Settings.desde_entorno()
+    defecto = Settings(**{nombre.lower(): valor for nombre, valor in OBLIGATORIAS.items()})
+
+    assert settings == defecto
+
+
+def test_variables_definidas_se_convierten_al_tipo_del_campo(entorno):
+    entorno.setenv("TAMANO_MINIMO_COMPRESION", "1024")
+    entorno.setenv("ARCHIVO_ACTIVO", "false")
+    entorno.setenv("ARCHIVO_INTERVALO_HORAS", "0.5")
+    entorno.setenv("CORS_ORIGINS", "http://localhost, https://mitienda.cl")
+
+    settings = Settings.desde_entorno()
+
+    assert settings.tamano_minimo_compresion == 1024
+    assert settings.archivo_activo is False
+    assert settings.archivo_intervalo_horas == 0.5
+    assert settings.cors_origins == ["http://localhost", "https://mitienda.cl"]
+
+
+def test_falta_una_variable_obligatoria(entorno):
+    entorno.delenv("MONGO_URL")
+
+    with pytest.raises(ValueError, match="MONGO_URL"):
+        Settings.desde_entorno()